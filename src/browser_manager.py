@@ -13,12 +13,28 @@ class BrowserManager:
         """Starts the Playwright browser session."""
         self.playwright = await async_playwright().start()
         self.browser = await self.playwright.chromium.launch(headless=self.headless)
+        await self.new_context()
+
+    async def new_context(self, record_video_dir: str = "captured_workflows/videos/"):
+        """
+        Creates a fresh context and page on the already launched browser.
+        Video is recorded for debugging/Loom unless record_video_dir is None.
+        """
+        if not self.browser:
+            raise Exception("Browser not started. Call start() first.")
         self.context = await self.browser.new_context(
             viewport={"width": 1920, "height": 1080},
-            record_video_dir="captured_workflows/videos/" # Record video for debugging/Loom
+            record_video_dir=record_video_dir
         )
         self.page = await self.context.new_page()
 
+    async def close_context(self):
+        """Closes the current context (flushing its video) but keeps the browser running."""
+        if self.context:
+            await self.context.close()
+        self.context = None
+        self.page = None
+
     async def navigate(self, url: str):
         """Navigates to a specific URL."""
         if not self.page:
@@ -1,10 +1,12 @@
+import asyncio
 import os
 from playwright.async_api import Page
 from datetime import datetime
 
 class StateCapturer:
-    def __init__(self, output_dir: str = "captured_workflows"):
+    def __init__(self, output_dir: str = "captured_workflows", index=None):
         self.output_dir = output_dir
+        self.index = index # Optional WorkflowIndex, updated as each step is written
         os.makedirs(self.output_dir, exist_ok=True)
 
     async def capture_state(self, page: Page, step_name: str, task_id: str, action_description: str = ""):
@@ -29,7 +31,15 @@ class StateCapturer:
             "action_taken": action_description
         }
         import json
-        with open(os.path.join(task_dir, f"{step_name}_{timestamp}_metadata.json"), "w") as f:
+        metadata_path = os.path.join(task_dir, f"{step_name}_{timestamp}_metadata.json")
+        with open(metadata_path, "w") as f:
             json.dump(metadata, f, indent=2)
+
+        if self.index:
+            # Indexing is secondary: keep SQLite and hashing off the event loop and never fail the capture
+            try:
+                await asyncio.to_thread(self.index.add_capture, task_id, metadata_path)
+            except Exception as e:
+                print(f"Error indexing {metadata_path}: {e}")
         
         return screenshot_path
@@ -1,5 +1,6 @@
 import argparse
 import asyncio
+import json
 import sys
 import os
 
@@ -8,6 +9,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.generate_dataset import main as generate_main
 from src.combine_videos import combine_videos
+from src.indexer import WorkflowIndex
+from src import daemon
 
 def run_cli():
     parser = argparse.ArgumentParser(description="Web Flow Capture Agent CLI")
@@ -19,6 +22,40 @@ def run_cli():
 
     # Combine Command
     combine_parser = subparsers.add_parser("combine", help="Combine captured videos")
+
+    # Index Command
+    index_parser = subparsers.add_parser("index", help="Update the SQLite index of captured workflows")
+    index_parser.add_argument("--dir", default=None, help="Captured workflows directory")
+
+    # Query Command
+    query_parser = subparsers.add_parser("query", help="Query indexed steps and optionally export them")
+    query_parser.add_argument("--dir", default=None, help="Captured workflows directory")
+    query_parser.add_argument("--task", help="Exact task name")
+    query_parser.add_argument("--host", help="Hostname, subdomains included (e.g. github.com)")
+    query_parser.add_argument("--action", help="Action type (click, type, navigate, finish)")
+    query_parser.add_argument("--selector", help="Substring of the action selector")
+    query_parser.add_argument("--url", help="Substring of the page URL")
+    query_parser.add_argument("--image-hash", help="sha256 of the screenshot")
+    query_parser.add_argument("--limit", type=int, help="Maximum number of steps")
+    query_parser.add_argument("--export", help="Copy matching screenshots/metadata to this directory")
+    query_parser.add_argument("--refresh", action="store_true", help="Rescan captured files before querying")
+
+    # Daemon Command
+    daemon_parser = subparsers.add_parser("daemon", help="Serve task jobs from a pool of warm browsers")
+    daemon_parser.add_argument("--pool-size", type=int, default=2, help="Number of pre-launched browsers")
+    daemon_parser.add_argument("--headed", action="store_true", help="Show the pooled browser windows")
+    daemon_parser.add_argument("--record-video", action="store_true",
+                               help="Record each job to captured_workflows/<task>/video/ (contexts are then created per job)")
+    daemon_parser.add_argument("--host", default=daemon.DEFAULT_HOST, help="Address to listen on")
+    daemon_parser.add_argument("--port", type=int, default=daemon.DEFAULT_PORT, help="Port to listen on")
+
+    # Submit Command
+    submit_parser = subparsers.add_parser("submit", help="Submit a task job to a running daemon")
+    submit_parser.add_argument("name", help="Task name (output folder)")
+    submit_parser.add_argument("start_url", help="URL to start from")
+    submit_parser.add_argument("goal", help="Goal for the agent")
+    submit_parser.add_argument("--host", default=daemon.DEFAULT_HOST, help="Daemon address")
+    submit_parser.add_argument("--port", type=int, default=daemon.DEFAULT_PORT, help="Daemon port")
     
     args = parser.parse_args()
 
@@ -39,6 +76,55 @@ def run_cli():
             return
             
         combine_videos(video_dir, output_file)
+
+    elif args.command in ("index", "query"):
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output_dir = args.dir or os.path.join(base_dir, "captured_workflows")
+        # Captures are indexed as they are written, so query only rescans on request
+        # or when there is no index yet
+        needs_refresh = args.command == "index" or args.refresh or \
+            not os.path.exists(os.path.join(output_dir, "index.sqlite"))
+        index = WorkflowIndex(output_dir)
+        try:
+            if needs_refresh:
+                updated = index.refresh()
+                print(f"Indexed {updated} changed files into {index.db_path}")
+            if args.command == "index":
+                return
+
+            steps = index.query(
+                task=args.task,
+                host=args.host,
+                action_type=args.action,
+                selector_contains=args.selector,
+                url_contains=args.url,
+                image_hash=args.image_hash,
+                limit=args.limit,
+            )
+            if args.export:
+                manifest = index.export(steps, args.export)
+                print(f"Exported {len(steps)} steps to {manifest}")
+            else:
+                for step in steps:
+                    print(f"{step['task_id']}\t{step['step']}\t{step['action_type']}\t{step['selector'] or ''}\t{step['url']}")
+        finally:
+            index.close()
+
+    elif args.command == "daemon":
+        try:
+            asyncio.run(daemon.main(args.pool_size, not args.headed, args.host, args.port, args.record_video))
+        except KeyboardInterrupt:
+            print("Daemon stopped.")
+
+    elif args.command == "submit":
+        async def stream_events():
+            async for event in daemon.submit_job(args.name, args.start_url, args.goal, args.host, args.port):
+                if event["event"] == "log":
+                    print(f"[{event['time']:.2f}s] {event['message']}")
+                else:
+                    print(json.dumps(event))
+
+        asyncio.run(stream_events())
         
     else:
         parser.print_help()
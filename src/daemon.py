@@ -0,0 +1,284 @@
+import asyncio
+import contextlib
+import json
+import os
+import time
+import uuid
+from playwright.async_api import async_playwright
+from src.browser_manager import BrowserManager
+from src.capture import StateCapturer
+from src.agent import AgentBrain
+from src.generate_dataset import run_task
+from src.indexer import WorkflowIndex
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+RELAUNCH_ATTEMPTS = 3
+JOB_FIELDS = ("name", "start_url", "goal")
+# Entries of captured_workflows/ that a task name must not collide with
+RESERVED_NAMES = (".", "..", "videos", "index.sqlite")
+
+
+def validate_job(job):
+    """Raises ValueError unless job is a well-formed job whose name is safe to use as a task directory."""
+    if not isinstance(job, dict):
+        raise ValueError(f"expected an object with {', '.join(JOB_FIELDS)}")
+    for field in JOB_FIELDS:
+        if not isinstance(job.get(field), str) or not job[field].strip():
+            raise ValueError(f"'{field}' must be a non-empty string")
+    if "id" in job and not isinstance(job["id"], str):
+        raise ValueError("'id' must be a string")
+    name = job["name"]
+    if any(char in name for char in "/\\\0") or name in RESERVED_NAMES:
+        raise ValueError(f"'name' must be a plain task directory name, got {name!r}")
+
+
+class BrowserPool:
+    """
+    Keeps pool_size Chromium browsers launched, each with a pre-created context
+    and page, so a job only has to wait for a lease instead of a launch.
+    Released browsers get a fresh context in the background before re-entering the pool.
+
+    Warm contexts do not record video. With record_video=True only the browsers
+    are kept warm and each lease creates its context recording into the job's own
+    video directory, so recordings start with the job instead of at warm-up.
+    """
+
+    def __init__(self, pool_size: int = 2, headless: bool = True, record_video: bool = False):
+        self.pool_size = pool_size
+        self.headless = headless
+        self.record_video = record_video
+        self.playwright = None
+        self.managers = []
+        self.ready: asyncio.Queue = asyncio.Queue()
+        self.pending = set()
+
+    async def start(self):
+        """Starts Playwright once and warms up every slot in parallel."""
+        self.playwright = await async_playwright().start()
+        # Wait for every launch, so a failed slot can't leave others starting after stop()
+        results = await asyncio.gather(*(self._add_slot() for _ in range(self.pool_size)), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+    async def _add_slot(self):
+        manager = BrowserManager(headless=self.headless)
+        manager.browser = await self.playwright.chromium.launch(headless=self.headless)
+        try:
+            await self._warm(manager)
+        except Exception:
+            with contextlib.suppress(Exception):
+                await manager.browser.close()
+            raise
+        self.managers.append(manager)
+        self.ready.put_nowait(manager)
+
+    async def _warm(self, manager: BrowserManager):
+        if not self.record_video:
+            await manager.new_context(record_video_dir=None)
+
+    async def acquire(self, video_dir: str = None) -> BrowserManager:
+        """
+        Waits for a warm browser with a fresh context and page.
+        video_dir is where the job's video is recorded when the pool records video.
+        Raises RuntimeError once every browser slot has been lost.
+        """
+        if not self.managers and not self.pending:
+            raise RuntimeError("Browser pool is empty")
+        manager = await self.ready.get()
+        if manager is None:
+            # Sentinel from _replenish: wake the next waiter too
+            self.ready.put_nowait(None)
+            raise RuntimeError("Browser pool is empty")
+        if self.record_video:
+            try:
+                await manager.new_context(record_video_dir=video_dir)
+            except Exception:
+                self.release(manager)
+                raise
+        return manager
+
+    def release(self, manager: BrowserManager):
+        """Hands a leased browser back; its context is replaced in the background."""
+        task = asyncio.create_task(self._replenish(manager))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def _replenish(self, manager: BrowserManager):
+        try:
+            await manager.close_context()
+            if not manager.browser.is_connected():
+                # Browser crashed during the job, launch a replacement
+                manager.browser = await self.playwright.chromium.launch(headless=self.headless)
+            await self._warm(manager)
+            self.ready.put_nowait(manager)
+            return
+        except Exception as e:
+            print(f"Error replenishing browser: {e}")
+
+        self.managers.remove(manager)
+        with contextlib.suppress(Exception):
+            await manager.browser.close()
+        for attempt in range(1, RELAUNCH_ATTEMPTS + 1):
+            try:
+                await self._add_slot()
+                return
+            except Exception as e:
+                print(f"Error relaunching browser (attempt {attempt}/{RELAUNCH_ATTEMPTS}): {e}")
+        print(f"Browser slot lost, pool now has {len(self.managers)} browsers")
+        if not self.managers:
+            self.ready.put_nowait(None)
+
+    async def stop(self):
+        """Closes every browser and the shared Playwright driver."""
+        if self.pending:
+            await asyncio.gather(*self.pending, return_exceptions=True)
+        for manager in self.managers:
+            with contextlib.suppress(Exception):
+                await manager.close_context()
+                await manager.browser.close()
+        self.managers = []
+        if self.playwright:
+            await self.playwright.stop()
+
+
+class CaptureDaemon:
+    """
+    Local job server in front of a BrowserPool.
+    Protocol: newline-delimited JSON over TCP. Each request line is a job
+    {"name", "start_url", "goal", optional "id"}; the server streams back
+    "accepted", "started", "log" and finally "done" or "error" events, each
+    tagged with the job id. Jobs on one connection run concurrently, up to the
+    pool size, so their events may interleave.
+    """
+
+    def __init__(self, pool: BrowserPool, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, output_dir: str = None):
+        self.pool = pool
+        self.host = host
+        self.port = port
+        if output_dir is None:
+            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            output_dir = os.path.join(base_dir, "captured_workflows")
+        # Shared across jobs so the OpenAI client and SQLite index are opened once
+        self.brain = AgentBrain()
+        self.capturer = StateCapturer(output_dir, index=WorkflowIndex(output_dir))
+        self.server = None
+
+    async def serve_forever(self):
+        try:
+            await self.pool.start()
+            self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+            print(f"Capture daemon listening on {self.host}:{self.port} with {self.pool.pool_size} warm browsers")
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            await self.pool.stop()
+            self.capturer.index.close()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+        jobs = set()
+
+        def send(event):
+            # A single write() of a whole line, so events from concurrent jobs never interleave mid-line
+            writer.write((json.dumps(event) + "\n").encode())
+
+        async def flush():
+            async with write_lock:
+                await writer.drain()
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Line longer than the stream limit; the stream can't be resynchronised
+                    send({"event": "error", "error": "Invalid job: line too long"})
+                    await flush()
+                    break
+                if not line:
+                    break
+
+                try:
+                    job = json.loads(line)
+                    validate_job(job)
+                except ValueError as e:
+                    send({"event": "error", "error": f"Invalid job: {e}"})
+                    await flush()
+                    continue
+
+                task = asyncio.create_task(self._run_job(job, send, flush))
+                jobs.add(task)
+                task.add_done_callback(jobs.discard)
+        except ConnectionError:
+            pass
+        finally:
+            # Let running jobs finish (their captures are still written to disk) before closing
+            if jobs:
+                await asyncio.gather(*jobs, return_exceptions=True)
+            writer.close()
+
+    async def _run_job(self, job, send, flush):
+        job_id = job.get("id") or uuid.uuid4().hex
+        task_name = job["name"]
+        submitted = time.time()
+        send({"event": "accepted", "id": job_id})
+        await flush()
+
+        try:
+            manager = await self.pool.acquire(os.path.join(self.capturer.output_dir, task_name, "video"))
+        except Exception as e:
+            send({"event": "error", "id": job_id, "error": f"No browser available: {e}"})
+            await flush()
+            return
+
+        send({"event": "started", "id": job_id, "lease_wait": time.time() - submitted})
+        try:
+            task_dir, error = await run_task(
+                task_name,
+                job["start_url"],
+                job["goal"],
+                browser_manager=manager,
+                brain=self.brain,
+                capturer=self.capturer,
+                on_log=lambda entry: send({"event": "log", "id": job_id, **entry}),
+            )
+            if error:
+                send({"event": "error", "id": job_id, "task_dir": task_dir, "error": error})
+            else:
+                send({"event": "done", "id": job_id, "task_dir": task_dir, "elapsed": time.time() - submitted})
+        except Exception as e:
+            send({"event": "error", "id": job_id, "error": str(e)})
+        finally:
+            self.pool.release(manager)
+        with contextlib.suppress(ConnectionError):
+            await flush()
+
+
+async def submit_job(task_name, start_url, goal, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+    """Submits one job to a running daemon and yields its events until it finishes."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        job = {"name": task_name, "start_url": start_url, "goal": goal}
+        writer.write((json.dumps(job) + "\n").encode())
+        await writer.drain()
+        while line := await reader.readline():
+            event = json.loads(line)
+            yield event
+            if event["event"] in ("done", "error"):
+                break
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def main(pool_size: int = 2, headless: bool = True, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+               record_video: bool = False):
+    pool = BrowserPool(pool_size=pool_size, headless=headless, record_video=record_video)
+    daemon = CaptureDaemon(pool, host=host, port=port)
+    await daemon.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
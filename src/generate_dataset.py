@@ -8,33 +8,53 @@ from src.capture import StateCapturer
 from src.agent import AgentBrain
 from src.main import extract_interactive_elements
 from src.combine_videos import combine_videos
+from src.indexer import WorkflowIndex
 
 class TaskLogger:
-    def __init__(self):
+    def __init__(self, on_log=None):
         self.logs = []
         self.start_time = time.time()
+        self.on_log = on_log # Optional callback(entry) for streaming progress
         
     def log(self, message):
         elapsed = time.time() - self.start_time
         print(f"[{elapsed:.2f}s] {message}")
-        self.logs.append({
+        entry = {
             "time": elapsed,
-            "message": message
-        })
+            "message": message,
+            "wall_time": time.time() # Lets the index tell this run's steps from older ones
+        }
+        self.logs.append(entry)
+        if self.on_log:
+            self.on_log(entry)
         
     def save(self, path):
         with open(path, 'w') as f:
             json.dump(self.logs, f, indent=2)
 
-async def run_task(task_name, start_url, goal):
-    logger = TaskLogger()
+async def run_task(task_name, start_url, goal, browser_manager=None, brain=None, capturer=None, on_log=None):
+    """
+    Runs a single task. A started browser_manager (e.g. leased from the daemon's
+    BrowserPool) and a capturer with its index can be passed in, in which case
+    they are left open for the caller.
+    Returns (task_dir, error), where error is None only if the agent finished.
+    """
+    logger = TaskLogger(on_log=on_log)
     logger.log(f"=== Running Task: {task_name} ===")
     
-    browser_manager = BrowserManager(headless=False)
-    capturer = StateCapturer()
-    brain = AgentBrain()
+    owns_browser = browser_manager is None
+    if owns_browser:
+        browser_manager = BrowserManager(headless=False)
+    owns_capturer = capturer is None
+    if owns_capturer:
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output_dir = os.path.join(base_dir, "captured_workflows")
+        capturer = StateCapturer(output_dir, index=WorkflowIndex(output_dir))
+    brain = brain or AgentBrain()
+    error = f"Task {task_name} did not finish within the step limit"
     
-    await browser_manager.start()
+    if owns_browser:
+        await browser_manager.start()
     try:
         logger.log(f"Navigating to {start_url}")
         await browser_manager.navigate(start_url)
@@ -65,6 +85,7 @@ async def run_task(task_name, start_url, goal):
             # Act
             if action["type"] == "finish":
                 logger.log(f"Task {task_name} completed.")
+                error = None
                 break
             elif action["type"] == "click":
                 await browser_manager.click(action["selector"])
@@ -80,15 +101,26 @@ async def run_task(task_name, start_url, goal):
             step += 1
             
     except Exception as e:
-        logger.log(f"Error in task {task_name}: {e}")
+        error = f"Error in task {task_name}: {e}"
+        logger.log(error)
     finally:
-        await browser_manager.stop()
+        if owns_browser:
+            await browser_manager.stop()
         
         # Save logs
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        task_dir = os.path.join(base_dir, "captured_workflows", task_name)
+        task_dir = os.path.join(capturer.output_dir, task_name)
         os.makedirs(task_dir, exist_ok=True)
         logger.save(os.path.join(task_dir, "logs.json"))
+        # Pick up step timings from logs.json
+        if capturer.index:
+            try:
+                await asyncio.to_thread(capturer.index.refresh_task, task_dir)
+            except Exception as e:
+                print(f"Error indexing task {task_name}: {e}")
+            if owns_capturer:
+                capturer.index.close()
+
+    return task_dir, error
 
 async def main():
     tasks = [
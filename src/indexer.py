@@ -0,0 +1,342 @@
+import ast
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlparse
+
+# Bump when the tables below change; older index files are dropped and rebuilt
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    task_dir TEXT NOT NULL,
+    logs_mtime REAL,
+    duration REAL
+);
+CREATE TABLE IF NOT EXISTS steps (
+    metadata_path TEXT PRIMARY KEY,
+    task_id TEXT NOT NULL,
+    step TEXT NOT NULL,
+    step_number INTEGER,
+    timestamp TEXT,
+    url TEXT,
+    host TEXT,
+    host_rev TEXT,
+    action_type TEXT,
+    selector TEXT,
+    action_text TEXT,
+    action_taken TEXT,
+    elapsed REAL,
+    screenshot_path TEXT,
+    image_hash TEXT,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_steps_order ON steps (task_id, step_number, timestamp);
+CREATE INDEX IF NOT EXISTS idx_steps_action_host ON steps (action_type, host_rev);
+CREATE INDEX IF NOT EXISTS idx_steps_host ON steps (host_rev);
+CREATE INDEX IF NOT EXISTS idx_steps_image_hash ON steps (image_hash);
+"""
+
+METADATA_SUFFIX = "_metadata.json"
+
+
+def parse_action(action_taken: str) -> Dict[str, Any]:
+    """
+    Parses the action description stored by StateCapturer.
+    generate_dataset stores str(action), i.e. a Python dict repr, so fall back
+    from JSON to literal_eval and finally to an empty action.
+    """
+    if not action_taken:
+        return {}
+    for loader in (json.loads, ast.literal_eval):
+        try:
+            action = loader(action_taken)
+        except (ValueError, SyntaxError):
+            continue
+        if isinstance(action, dict):
+            return action
+    return {}
+
+
+def reverse_host(host: str) -> str:
+    """
+    Returns the hostname with its labels reversed and a trailing dot
+    (docs.github.com -> com.github.docs.), so that a host and all of its
+    subdomains form one contiguous, index-friendly range.
+    """
+    if not host:
+        return ""
+    return ".".join(reversed(host.lower().split("."))) + "."
+
+
+def escape_like(value: str) -> str:
+    """Escapes LIKE wildcards so value is matched literally (use with ESCAPE '\\')."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def hash_file(path: str) -> Optional[str]:
+    """Returns the sha256 hex digest of a file, or None if it is missing."""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class WorkflowIndex:
+    """
+    SQLite catalogue of the tasks and steps under captured_workflows/.
+    Kept up to date either by refresh() (mtime based, only re-parses changed
+    files) or by add_capture() as StateCapturer writes each step.
+    """
+
+    def __init__(self, output_dir: str = "captured_workflows", db_path: str = None):
+        # Paths are stored absolute so captures and refreshes agree on row keys
+        self.output_dir = os.path.abspath(output_dir)
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.db_path = db_path or os.path.join(self.output_dir, "index.sqlite")
+        # StateCapturer indexes from a worker thread, so share the connection behind a lock
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.RLock()
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.conn.executescript("DROP TABLE IF EXISTS steps; DROP TABLE IF EXISTS tasks;")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def refresh(self) -> int:
+        """
+        Brings the index in line with the files on disk.
+        Every task directory is listed and each file's mtime compared with the
+        index, so only new or rewritten files are parsed. Returns the number of
+        files (re)parsed.
+        """
+        with self.lock:
+            known = {row["task_id"] for row in self.conn.execute("SELECT task_id FROM tasks")}
+            seen = set()
+            updated = 0
+            with os.scandir(self.output_dir) as entries:
+                for entry in entries:
+                    if not entry.is_dir() or entry.name == "videos":
+                        continue
+                    seen.add(entry.name)
+                    updated += self.refresh_task(entry.path)
+
+            for task_id in known - seen:
+                self.conn.execute("DELETE FROM steps WHERE task_id = ?", (task_id,))
+                self.conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+            self.conn.commit()
+            return updated
+
+    def refresh_task(self, task_dir: str) -> int:
+        """Re-indexes the changed metadata files and logs of a single task directory."""
+        with self.lock:
+            return self._refresh_task(os.path.abspath(task_dir))
+
+    def _refresh_task(self, task_dir: str) -> int:
+        task_id = os.path.basename(task_dir)
+        indexed = {
+            row["metadata_path"]: row["mtime"]
+            for row in self.conn.execute(
+                "SELECT metadata_path, mtime FROM steps WHERE task_id = ?", (task_id,)
+            )
+        }
+
+        updated = 0
+        present = set()
+        logs_mtime = None
+        with os.scandir(task_dir) as entries:
+            for entry in entries:
+                if entry.name == "logs.json":
+                    logs_mtime = entry.stat().st_mtime
+                elif entry.name.endswith(METADATA_SUFFIX):
+                    present.add(entry.path)
+                    mtime = entry.stat().st_mtime
+                    if indexed.get(entry.path) != mtime:
+                        self._upsert_step(task_id, entry.path, mtime)
+                        updated += 1
+
+        for stale in set(indexed) - present:
+            self.conn.execute("DELETE FROM steps WHERE metadata_path = ?", (stale,))
+
+        row = self.conn.execute(
+            "SELECT logs_mtime FROM tasks WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        logs_changed = row is None or row["logs_mtime"] != logs_mtime
+
+        self.conn.execute(
+            "INSERT INTO tasks (task_id, task_dir, logs_mtime) VALUES (?, ?, ?) "
+            "ON CONFLICT(task_id) DO UPDATE SET task_dir = excluded.task_dir, "
+            "logs_mtime = excluded.logs_mtime",
+            (task_id, task_dir, logs_mtime),
+        )
+        if logs_mtime is not None and (updated or logs_changed):
+            self._apply_logs(task_id, os.path.join(task_dir, "logs.json"), logs_mtime)
+            if logs_changed:
+                updated += 1
+        self.conn.commit()
+        return updated
+
+    def add_capture(self, task_id: str, metadata_path: str):
+        """Indexes a single step as soon as StateCapturer has written it."""
+        metadata_path = os.path.abspath(metadata_path)
+        task_dir = os.path.dirname(metadata_path)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO tasks (task_id, task_dir) VALUES (?, ?)",
+                (task_id, task_dir),
+            )
+            self._upsert_step(task_id, metadata_path, os.stat(metadata_path).st_mtime)
+            self.conn.commit()
+
+    def _upsert_step(self, task_id: str, metadata_path: str, mtime: float):
+        try:
+            with open(metadata_path, "r") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Skipping unreadable metadata {metadata_path}: {e}")
+            return
+
+        action = parse_action(metadata.get("action_taken", ""))
+        step = metadata.get("step", "")
+        step_number = None
+        if step.startswith("step_") and step[5:].isdigit():
+            step_number = int(step[5:])
+        url = metadata.get("url", "")
+        host = urlparse(url).hostname or ""
+        screenshot_path = metadata_path[: -len(METADATA_SUFFIX)] + ".png"
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO steps (metadata_path, task_id, step, step_number, timestamp, "
+            "url, host, host_rev, action_type, selector, action_text, action_taken, elapsed, "
+            "screenshot_path, image_hash, mtime) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, "
+            "(SELECT elapsed FROM steps WHERE metadata_path = ?), ?, ?, ?)",
+            (
+                metadata_path,
+                task_id,
+                step,
+                step_number,
+                metadata.get("timestamp"),
+                url,
+                host,
+                reverse_host(host),
+                action.get("type"),
+                action.get("selector"),
+                action.get("text"),
+                metadata.get("action_taken", ""),
+                metadata_path,
+                screenshot_path,
+                hash_file(screenshot_path),
+                mtime,
+            ),
+        )
+
+    def _apply_logs(self, task_id: str, logs_path: str, logs_mtime: float):
+        """
+        Copies per-step elapsed times and the task duration from logs.json (TaskLogger).
+        A task dir can hold steps from several runs while logs.json only describes
+        the latest one, so only steps written since that run started are updated.
+        """
+        try:
+            with open(logs_path, "r") as f:
+                logs = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Skipping unreadable logs {logs_path}: {e}")
+            return
+        if not logs:
+            return
+
+        # Older logs have no wall_time; estimate the start from when logs.json was saved
+        run_start = logs[0].get("wall_time", logs_mtime - logs[-1]["time"])
+        for entry in logs:
+            message = entry.get("message", "")
+            if message.startswith("Step ") and message[5:].isdigit():
+                self.conn.execute(
+                    "UPDATE steps SET elapsed = ? WHERE task_id = ? AND step_number = ? AND mtime >= ?",
+                    (entry["time"], task_id, int(message[5:]), run_start),
+                )
+        duration = logs[-1]["time"]
+        self.conn.execute(
+            "UPDATE tasks SET duration = ? WHERE task_id = ?", (duration, task_id)
+        )
+
+    def query(
+        self,
+        task: str = None,
+        host: str = None,
+        action_type: str = None,
+        selector_contains: str = None,
+        url_contains: str = None,
+        image_hash: str = None,
+        limit: int = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns the indexed steps matching every given filter, ordered by task and step.
+        host matches the hostname exactly or any of its subdomains; selector_contains
+        and url_contains are literal, case-insensitive substrings.
+        """
+        clauses = []
+        params = []
+        if task:
+            clauses.append("task_id = ?")
+            params.append(task)
+        if host:
+            # "com.github." up to (excluding) "com.github/" covers github.com and *.github.com
+            prefix = reverse_host(host)
+            clauses.append("host_rev >= ? AND host_rev < ?")
+            params.extend([prefix, prefix[:-1] + "/"])
+        if action_type:
+            clauses.append("action_type = ?")
+            params.append(action_type)
+        if selector_contains:
+            clauses.append("selector LIKE ? ESCAPE '\\'")
+            params.append(f"%{escape_like(selector_contains)}%")
+        if url_contains:
+            clauses.append("url LIKE ? ESCAPE '\\'")
+            params.append(f"%{escape_like(url_contains)}%")
+        if image_hash:
+            clauses.append("image_hash = ?")
+            params.append(image_hash)
+
+        sql = "SELECT * FROM steps"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY task_id, step_number, timestamp"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def export(self, steps: List[Dict[str, Any]], export_dir: str) -> str:
+        """
+        Copies the screenshots and metadata of the given steps into export_dir,
+        keeping the task folder layout, and writes an index.jsonl manifest.
+        Returns the manifest path.
+        """
+        os.makedirs(export_dir, exist_ok=True)
+        manifest_path = os.path.join(export_dir, "index.jsonl")
+        with open(manifest_path, "w") as manifest:
+            for step in steps:
+                task_dir = os.path.join(export_dir, step["task_id"])
+                os.makedirs(task_dir, exist_ok=True)
+                record = dict(step)
+                for key in ("metadata_path", "screenshot_path"):
+                    src = step[key]
+                    if src and os.path.exists(src):
+                        dst = os.path.join(task_dir, os.path.basename(src))
+                        shutil.copy2(src, dst)
+                        record[key] = os.path.relpath(dst, export_dir)
+                manifest.write(json.dumps(record) + "\n")
+        return manifest_path
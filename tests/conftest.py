@@ -0,0 +1,5 @@
+import sys
+import os
+
+# Add project root to path so tests can import src.* when run with plain `pytest`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
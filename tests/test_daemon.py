@@ -0,0 +1,282 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from src import daemon
+
+
+class FakeContext:
+    def __init__(self, browser, record_video_dir):
+        self.browser = browser
+        self.record_video_dir = record_video_dir
+        self.closed = False
+
+    async def new_page(self):
+        return object()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self, fail_contexts=False):
+        self.connected = True
+        self.closed = False
+        self.fail_contexts = fail_contexts
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, viewport=None, record_video_dir=None):
+        if self.fail_contexts:
+            raise RuntimeError("context failed")
+        context = FakeContext(self, record_video_dir)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeChromium:
+    def __init__(self):
+        self.browsers = []
+        self.fail_launch = False
+
+    async def launch(self, headless=True):
+        if self.fail_launch:
+            raise RuntimeError("launch failed")
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.chromium = FakeChromium()
+        self.stopped = False
+
+    async def stop(self):
+        self.stopped = True
+
+
+@pytest.fixture
+def playwright(monkeypatch):
+    fake = FakePlaywright()
+
+    class Starter:
+        async def start(self):
+            return fake
+
+    monkeypatch.setattr(daemon, "async_playwright", Starter)
+    return fake
+
+
+async def settle(pool):
+    """Waits for background replenishing to finish."""
+    while pool.pending:
+        await asyncio.gather(*pool.pending, return_exceptions=True)
+
+
+def test_validate_job():
+    daemon.validate_job({"name": "task_05", "start_url": "https://github.com/", "goal": "Search", "id": "a"})
+    invalid = [
+        [],
+        {"name": "task_05", "start_url": "https://github.com/"},
+        {"name": None, "start_url": "https://github.com/", "goal": "Search"},
+        {"name": " ", "start_url": "https://github.com/", "goal": "Search"},
+        {"name": "task_05", "start_url": "https://github.com/", "goal": "Search", "id": 1},
+        {"name": "../../tmp/evil", "start_url": "https://github.com/", "goal": "Search"},
+        {"name": "..\\evil", "start_url": "https://github.com/", "goal": "Search"},
+        {"name": "..", "start_url": "https://github.com/", "goal": "Search"},
+        {"name": "videos", "start_url": "https://github.com/", "goal": "Search"},
+        {"name": "index.sqlite", "start_url": "https://github.com/", "goal": "Search"},
+    ]
+    for job in invalid:
+        with pytest.raises(ValueError):
+            daemon.validate_job(job)
+
+
+def test_pool_lease_and_release(playwright):
+    async def run():
+        pool = daemon.BrowserPool(pool_size=1)
+        await pool.start()
+        manager = await pool.acquire()
+        first_context = manager.context
+        assert manager.page is not None
+        assert first_context.record_video_dir is None
+
+        pool.release(manager)
+        await settle(pool)
+        assert first_context.closed
+
+        again = await pool.acquire()
+        assert again is manager
+        assert again.context is not first_context
+        assert len(playwright.chromium.browsers) == 1
+
+        await pool.stop()
+        assert playwright.chromium.browsers[0].closed
+        assert playwright.stopped
+
+    asyncio.run(run())
+
+
+def test_pool_records_video_per_lease(playwright):
+    async def run():
+        pool = daemon.BrowserPool(pool_size=1, record_video=True)
+        await pool.start()
+        assert playwright.chromium.browsers[0].contexts == []
+
+        manager = await pool.acquire("/tmp/task_05/video")
+        assert manager.context.record_video_dir == "/tmp/task_05/video"
+        await pool.stop()
+
+    asyncio.run(run())
+
+
+def test_pool_relaunches_crashed_browser(playwright):
+    async def run():
+        pool = daemon.BrowserPool(pool_size=1)
+        await pool.start()
+        manager = await pool.acquire()
+        crashed = manager.browser
+        crashed.connected = False
+
+        pool.release(manager)
+        await settle(pool)
+        again = await pool.acquire()
+        assert again.browser is not crashed
+        assert len(playwright.chromium.browsers) == 2
+        await pool.stop()
+
+    asyncio.run(run())
+
+
+def test_pool_reports_empty_once_every_slot_is_lost(playwright):
+    async def run():
+        pool = daemon.BrowserPool(pool_size=1)
+        await pool.start()
+        manager = await pool.acquire()
+        waiter = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0)
+
+        # The context can't be replaced and no new browser can be launched
+        manager.browser.fail_contexts = True
+        playwright.chromium.fail_launch = True
+        pool.release(manager)
+        await settle(pool)
+
+        assert manager.browser.closed
+        assert pool.managers == []
+        with pytest.raises(RuntimeError, match="empty"):
+            await waiter
+        with pytest.raises(RuntimeError, match="empty"):
+            await pool.acquire()
+        await pool.stop()
+
+    asyncio.run(run())
+
+
+class DaemonClient:
+    """Talks NDJSON to a CaptureDaemon served on an ephemeral port."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def send(self, payload):
+        self.writer.write(payload if isinstance(payload, bytes) else (json.dumps(payload) + "\n").encode())
+        await self.writer.drain()
+
+    async def event(self):
+        line = await asyncio.wait_for(self.reader.readline(), timeout=5)
+        return json.loads(line) if line else None
+
+
+def serve(tmp_path, playwright, test):
+    async def run():
+        pool = daemon.BrowserPool(pool_size=2)
+        capture_daemon = daemon.CaptureDaemon(pool, output_dir=str(tmp_path / "captured_workflows"))
+        await pool.start()
+        server = await asyncio.start_server(capture_daemon._handle_client, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            await test(DaemonClient(reader, writer))
+        finally:
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            await pool.stop()
+            capture_daemon.capturer.index.close()
+
+    asyncio.run(run())
+
+
+def job(name, **extra):
+    return {"name": name, "start_url": "https://github.com/", "goal": "Search", **extra}
+
+
+def test_daemon_runs_pipelined_jobs_concurrently(tmp_path, playwright, monkeypatch):
+    both_started = asyncio.Event()
+    running = set()
+
+    async def fake_run_task(task_name, start_url, goal, browser_manager=None, brain=None, capturer=None, on_log=None):
+        running.add(task_name)
+        if len(running) == 2:
+            both_started.set()
+        on_log({"time": 0.0, "message": f"Running {task_name}"})
+        # Only completes if both jobs hold a browser at the same time
+        await asyncio.wait_for(both_started.wait(), timeout=5)
+        error = "Error in task bad: boom" if task_name == "bad" else None
+        return f"/captured_workflows/{task_name}", error
+
+    monkeypatch.setattr(daemon, "run_task", fake_run_task)
+
+    async def test(client):
+        await client.send(job("good", id="job-good"))
+        await client.send(job("bad", id="job-bad"))
+
+        finals = {}
+        logs = {}
+        while len(finals) < 2:
+            event = await client.event()
+            if event["event"] == "log":
+                logs[event["id"]] = event["message"]
+            elif event["event"] in ("done", "error"):
+                finals[event["id"]] = event
+
+        assert logs == {"job-good": "Running good", "job-bad": "Running bad"}
+        assert finals["job-good"]["event"] == "done"
+        assert finals["job-good"]["task_dir"] == "/captured_workflows/good"
+        assert finals["job-bad"]["event"] == "error"
+        assert finals["job-bad"]["error"] == "Error in task bad: boom"
+
+    serve(tmp_path, playwright, test)
+
+
+def test_daemon_rejects_invalid_jobs(tmp_path, playwright, monkeypatch):
+    async def fail_run_task(*args, **kwargs):
+        raise AssertionError("invalid jobs must not run")
+
+    monkeypatch.setattr(daemon, "run_task", fail_run_task)
+
+    async def test(client):
+        await client.send(b"not json\n")
+        assert (await client.event())["error"].startswith("Invalid job")
+        await client.send(job(None))
+        assert "'name' must be a non-empty string" in (await client.event())["error"]
+        await client.send(job("../../../tmp/evil"))
+        assert "plain task directory name" in (await client.event())["error"]
+
+        # A line over the stream limit gets an error and the connection is closed
+        await client.send(b"x" * (1 << 17) + b"\n")
+        assert (await client.event())["error"] == "Invalid job: line too long"
+        assert await client.event() is None
+
+    serve(tmp_path, playwright, test)
@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from src.indexer import WorkflowIndex, parse_action
+
+
+def write_step(task_dir, step, action, url="https://github.com/", timestamp="20250101_000000"):
+    """Writes a step the way StateCapturer does and returns its metadata path."""
+    os.makedirs(task_dir, exist_ok=True)
+    base = os.path.join(task_dir, f"{step}_{timestamp}")
+    with open(base + ".png", "wb") as f:
+        f.write(step.encode())
+    with open(base + "_metadata.json", "w") as f:
+        json.dump({"timestamp": timestamp, "url": url, "step": step, "action_taken": str(action)}, f)
+    return base + "_metadata.json"
+
+
+def write_logs(task_dir, logs):
+    with open(os.path.join(task_dir, "logs.json"), "w") as f:
+        json.dump(logs, f)
+
+
+def bump_mtime(path):
+    """Moves a file's mtime forward so rewrites are detected regardless of timestamp resolution."""
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = WorkflowIndex(str(tmp_path / "captured_workflows"))
+    yield index
+    index.close()
+
+
+def test_parse_action():
+    assert parse_action("{'type': 'click', 'selector': '#q'}") == {"type": "click", "selector": "#q"}
+    assert parse_action('{"type": "finish"}') == {"type": "finish"}
+    assert parse_action("") == {}
+    assert parse_action("not an action") == {}
+    assert parse_action("['click']") == {}
+
+
+def test_refresh_is_incremental(index):
+    task_dir = os.path.join(index.output_dir, "task_a")
+    step_1 = write_step(task_dir, "step_01", {"type": "click", "selector": ".search-input"})
+    write_step(task_dir, "step_02", {"type": "navigate", "url": "https://github.com/search"})
+    write_logs(task_dir, [{"time": 0.5, "message": "Step 1"}, {"time": 2.0, "message": "Step 2"}])
+
+    assert index.refresh() == 3
+    assert index.refresh() == 0
+    steps = index.query(task="task_a")
+    assert [s["action_type"] for s in steps] == ["click", "navigate"]
+    assert [s["elapsed"] for s in steps] == [0.5, 2.0]
+
+    # Files rewritten in place don't change the directory mtime but must still be picked up
+    write_step(task_dir, "step_01", {"type": "type", "selector": "#q", "text": "AutoGPT"})
+    bump_mtime(step_1)
+    write_logs(task_dir, [{"time": 1.5, "message": "Step 1"}, {"time": 3.0, "message": "Step 2"}])
+    bump_mtime(os.path.join(task_dir, "logs.json"))
+    assert index.refresh() == 2
+    step = index.query(task="task_a", limit=1)[0]
+    assert (step["action_type"], step["action_text"], step["elapsed"]) == ("type", "AutoGPT", 1.5)
+
+    os.remove(step_1)
+    index.refresh()
+    assert [s["step"] for s in index.query(task="task_a")] == ["step_02"]
+
+    write_step(os.path.join(index.output_dir, "task_b"), "step_01", {"type": "finish"})
+    index.refresh()
+    assert {s["task_id"] for s in index.query()} == {"task_a", "task_b"}
+
+    shutil.rmtree(task_dir)
+    index.refresh()
+    assert {s["task_id"] for s in index.query()} == {"task_b"}
+
+
+def test_query_filters(index):
+    task_dir = os.path.join(index.output_dir, "task_a")
+    write_step(task_dir, "step_01", {"type": "click", "selector": "#search-input"})
+    write_step(task_dir, "step_02", {"type": "click", "selector": ".search_tab"}, url="https://docs.github.com/en")
+    write_step(task_dir, "step_03", {"type": "click", "selector": "#q"}, url="https://notgithub.com/")
+    write_step(task_dir, "step_04", {"type": "type", "selector": "#q", "text": "PEP 8"}, url="https://www.python.org/")
+    index.refresh()
+
+    def steps(**filters):
+        return [s["step"] for s in index.query(**filters)]
+
+    assert steps(host="github.com") == ["step_01", "step_02"]
+    assert steps(host="GitHub.com", action_type="click") == ["step_01", "step_02"]
+    assert steps(host="docs.github.com") == ["step_02"]
+    assert steps(action_type="type") == ["step_04"]
+    assert steps(selector_contains="SEARCH-input") == ["step_01"]
+    # LIKE wildcards in the needle are matched literally
+    assert steps(selector_contains="h_t") == ["step_02"]
+    assert steps(selector_contains="h_i") == []
+    assert steps(url_contains="%") == []
+    assert steps(url_contains="python.org") == ["step_04"]
+
+
+def test_export(index, tmp_path):
+    task_dir = os.path.join(index.output_dir, "task_a")
+    write_step(task_dir, "step_01", {"type": "click", "selector": ".search-input"})
+    write_step(task_dir, "step_02", {"type": "finish"})
+    index.refresh()
+
+    export_dir = str(tmp_path / "subset")
+    manifest = index.export(index.query(action_type="click"), export_dir)
+
+    with open(manifest) as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 1
+    record = records[0]
+    assert record["screenshot_path"] == os.path.join("task_a", "step_01_20250101_000000.png")
+    assert os.path.exists(os.path.join(export_dir, record["screenshot_path"]))
+    assert os.path.exists(os.path.join(export_dir, record["metadata_path"]))
+    assert record["image_hash"] is not None
+
+
+def test_logs_only_time_steps_from_their_run(index):
+    task_dir = os.path.join(index.output_dir, "task_a")
+    first = write_step(task_dir, "step_01", {"type": "click", "selector": "#q"}, timestamp="20250101_000000")
+    os.utime(first, (1000, 1000))
+    write_logs(task_dir, [{"time": 0.5, "message": "Step 1", "wall_time": 999}])
+    index.refresh()
+
+    # A second run of the same task adds new step files and overwrites logs.json
+    second = write_step(task_dir, "step_01", {"type": "finish"}, timestamp="20250101_010000")
+    os.utime(second, (5000, 5000))
+    write_logs(task_dir, [{"time": 4.0, "message": "Step 1", "wall_time": 4990}])
+    bump_mtime(os.path.join(task_dir, "logs.json"))
+    index.refresh()
+
+    assert [s["elapsed"] for s in index.query(task="task_a")] == [0.5, 4.0]